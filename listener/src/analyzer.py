@@ -1,15 +1,71 @@
 """
 BirdNET analysis worker for detecting bird species in audio.
 """
+import math
 import numpy as np
 from queue import Queue, Empty
 import logging
-import threading
+import multiprocessing
+import signal
+import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+from typing import Optional
 import importlib.util
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+from config import setup_logging
+from queues import get_blocking
+from sample_pool import SamplePool
+
 logger = logging.getLogger("magpi-listener")
 
+# BirdNET analyzes audio in fixed 3-second chunks
+BIRDNET_CHUNK_SECONDS = 3.0
+
+# How long a worker waits to fill a batch once it has one sample
+BATCH_TIMEOUT = 0.1
+
+# Exit code of an analyzer process whose model failed to load
+EXIT_MODEL_LOAD_FAILED = 3
+
+
+if njit is not None:
+    # Compiled to a single fused pass over the samples; nogil keeps the
+    # analyzer's scheduler thread free to collect the next batch meanwhile
+    @njit(nogil=True, cache=True, fastmath=True, boundscheck=False)
+    def audio_features(x):
+        """Return (rms, zero_crossing_rate) of a float32 signal in one pass."""
+        n = x.shape[0]
+        if n == 0:
+            return 0.0, 0.0
+        s = 0.0
+        zc = 0
+        prev = x[0] >= 0
+        for i in range(n):
+            v = x[i]
+            s += v * v
+            cur = v >= 0
+            if cur != prev:
+                zc += 1
+            prev = cur
+        return math.sqrt(s / n), zc / n
+else:
+    def audio_features(x):
+        """Return (rms, zero_crossing_rate) of a float32 signal."""
+        n = x.shape[0]
+        if n == 0:
+            return 0.0, 0.0
+        rms = math.sqrt(float(np.dot(x, x)) / n)
+        signs = np.signbit(x)
+        zc = int(np.count_nonzero(signs[1:] != signs[:-1]))
+        return rms, zc / n
+
 
 class BirdNETAnalyzer:
     """Wrapper for BirdNET-Lite model."""
@@ -18,6 +74,10 @@ class BirdNETAnalyzer:
         self.config = config
         self.model = None
         self.labels = None
+        self.bn_analyzer = None
+        self.RecordingBuffer = None
+        # Staging buffer reused across analyze_batch calls
+        self._batch_buf = np.empty(0, dtype=np.float32)
         self._init_model()
     
     def _init_model(self):
@@ -29,17 +89,31 @@ class BirdNETAnalyzer:
                 logger.warning("birdnetlib not found, using mock analyzer")
                 return
             
-            from birdnetlib import Recording
-            from birdnetlib.analyzer_lite import LiteAnalyzer
+            from birdnetlib import RecordingBuffer
+
+            # Load the model once; every sample reuses this instance
+            if self.config.birdnet_model_path:
+                # Custom (e.g. INT8-quantized) TFLite model and its labels
+                from birdnetlib.analyzer import Analyzer
 
-            self.lite_analyzer = LiteAnalyzer()
-            self.Recording = Recording
-            logger.info("BirdNET-Lite loaded successfully")
+                self.bn_analyzer = Analyzer(
+                    classifier_model_path=self.config.birdnet_model_path,
+                    classifier_labels_path=self.config.birdnet_labels_path,
+                )
+                logger.info(
+                    f"BirdNET model loaded from {self.config.birdnet_model_path}"
+                )
+            else:
+                from birdnetlib.analyzer_lite import LiteAnalyzer
+
+                self.bn_analyzer = LiteAnalyzer()
+                logger.info("BirdNET-Lite loaded successfully")
+            self.RecordingBuffer = RecordingBuffer
             
         except ImportError:
             logger.warning("BirdNET-Lite not available, using mock analyzer")
-            self.Recording = None
-            self.lite_analyzer = None
+            self.RecordingBuffer = None
+            self.bn_analyzer = None
     
     def analyze(self, audio: np.ndarray, sample_rate: int) -> list:
         """
@@ -58,68 +132,97 @@ class BirdNETAnalyzer:
                 'end_time': 1.5
             }
         """
+        if self.RecordingBuffer is None:
+            # Use mock detection for testing
+            return self._mock_analyze(audio, sample_rate)
+        
+        # A batch of one: BirdNET is only ever invoked from analyze_batch
+        return self.analyze_batch([audio], sample_rate)[0]
+    
+    def _staging(self, size: int) -> np.ndarray:
+        """Return a reusable float32 buffer of ``size`` samples."""
+        if self._batch_buf.size < size:
+            self._batch_buf = np.empty(size, dtype=np.float32)
+        return self._batch_buf[:size]
+    
+    def analyze_batch(self, audios: list, sample_rate: int) -> list:
+        """
+        Analyze several audio samples with a single BirdNET pass.
+        
+        Each sample is zero-padded to a whole number of BirdNET chunks and
+        the samples are concatenated into one buffer, so the model setup
+        and chunk loop run once per batch. Detections are mapped back to
+        the sample they came from.
+        
+        Args:
+            audios: List of audio arrays, all recorded at ``sample_rate``
+            sample_rate: Sample rate in Hz
+        
+        Returns:
+            List of detection lists, one per input sample, in input order
+        """
+        if self.RecordingBuffer is None:
+            return [self._mock_analyze(audio, sample_rate) for audio in audios]
+        
         try:
-            if self.Recording is None:
-                # Use mock detection for testing
-                return self._mock_analyze(audio, sample_rate)
+            chunk_size = int(BIRDNET_CHUNK_SECONDS * sample_rate)
+            slot_size = max(
+                -(-len(audio) // chunk_size) * chunk_size for audio in audios
+            )
+            stacked = self._staging(len(audios) * slot_size).reshape(
+                len(audios), slot_size
+            )
+            for i, audio in enumerate(audios):
+                n = len(audio)
+                stacked[i, :n] = audio
+                stacked[i, n:] = 0
             
-            # Use BirdNET-Lite
-            # Save audio to temporary file for analysis
-            import tempfile
-            import soundfile as sf
-            import os
+            recording = self.RecordingBuffer(
+                self.bn_analyzer,
+                stacked.reshape(-1),
+                sample_rate,
+                lat=self.config.birdnet_location_lat,
+                lon=self.config.birdnet_location_lon,
+                min_conf=self.config.min_confidence,
+            )
             
-            # Create temp file but don't auto-delete
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
-                tmp_path = tmp.name
+            recording.analyze()
             
-            try:
-                # Write audio to temp file
-                sf.write(tmp_path, audio, sample_rate)
-                
-                # Run analysis. Recording expects the analyzer instance as the
-                # first argument, then the path to the audio file.
-                recording = self.Recording(
-                    self.lite_analyzer,
-                    tmp_path,
-                    lat=self.config.birdnet_location_lat,
-                    lon=self.config.birdnet_location_lon,
-                    min_conf=self.config.min_confidence,
-                )
-                
-                recording.analyze()
-                
-                # Process results
-                detections = []
-                for detection in recording.detections:
-                    if detection['confidence'] >= self.config.min_confidence:
-                        detections.append({
-                            'species': str(detection['scientific_name']),
-                            'confidence': float(detection['confidence']),
-                            'start_time': float(detection['start_time']),
-                            'end_time': float(detection['end_time'])
-                        })
-                
-                logger.debug(f"BirdNET found {len(detections)} detections")
-                return detections
+            # Demux detections back to their originating sample
+            slot_seconds = slot_size / sample_rate
+            results = [[] for _ in audios]
+            for detection in recording.detections:
+                if detection['confidence'] < self.config.min_confidence:
+                    continue
+                start_time = float(detection['start_time'])
+                idx = min(int(start_time // slot_seconds), len(audios) - 1)
+                offset = idx * slot_seconds
+                results[idx].append({
+                    'species': str(detection['scientific_name']),
+                    'confidence': float(detection['confidence']),
+                    'start_time': start_time - offset,
+                    'end_time': float(detection['end_time']) - offset
+                })
             
-            finally:
-                try:
-                    os.unlink(tmp_path)
-                except:
-                    pass
+            logger.debug(
+                f"BirdNET batch of {len(audios)} found "
+                f"{sum(len(r) for r in results)} detections"
+            )
+            return results
         
         except Exception as e:
-            logger.error(f"Error in analysis: {e}", exc_info=True)
-            return []
+            logger.error(f"Error in batch analysis: {e}", exc_info=True)
+            return [[] for _ in audios]
     
     def _mock_analyze(self, audio: np.ndarray, sample_rate: int) -> list:
         """Mock analyzer for testing without BirdNET."""
         # Simple detection based on audio energy
         # In production, this would use actual BirdNET
         
-        # Calculate RMS energy
-        rms = np.sqrt(np.mean(audio ** 2))
+        # Calculate RMS energy with a single dot product (no squared copy)
+        if audio.size == 0:
+            return []
+        rms = math.sqrt(float(np.dot(audio, audio)) / audio.size)
         
         # Mock species based on energy levels
         mock_species = [
@@ -151,68 +254,181 @@ class BirdNETAnalyzer:
 
 
 class AnalyzerWorker:
-    """Worker for analyzing audio samples."""
+    """
+    Worker for analyzing audio samples.
+    
+    Runs in its own process; the parent's copy of this object is never
+    updated after start(). The worker stops only when it receives a
+    poison pill (None) on its samples queue.
+    """
     
-    def __init__(self, config, samples_queue: Queue, detections_queue: Queue):
+    def __init__(self, config, samples_queue: Queue, detections_queue: Queue,
+                 sample_pool: SamplePool):
         self.config = config
         self.samples_queue = samples_queue
         self.detections_queue = detections_queue
-        self.running = False
-        self.analyzer = BirdNETAnalyzer(config)
+        self.sample_pool = sample_pool
+        # Loaded inside the worker process, see run()
+        self.analyzer = None
     
     def run(self):
-        """Main analysis loop."""
+        """Main analysis loop (runs in the worker process)."""
+        # Shutdown is driven by the parent through poison pills
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        setup_logging(self.config.log_level)
+        
+        exit_code = 0
         try:
+            try:
+                self.analyzer = BirdNETAnalyzer(self.config)
+            except Exception as e:
+                # Restarting cannot fix a model that fails to load; tell
+                # the parent through the exit code
+                logger.error(f"Failed to load BirdNET model: {e}")
+                exit_code = EXIT_MODEL_LOAD_FAILED
+                return
             logger.info("Analyzer worker started")
             
-            while self.running:
-                try:
-                    # Get sample from queue with timeout
-                    sample_data = self.samples_queue.get(timeout=1)
-                    
-                    if sample_data is None:
-                        # Poison pill, stop processing
-                        break
-                    
-                    # Analyze
-                    audio = sample_data['audio']
-                    timestamp = sample_data['timestamp']
-                    sample_rate = sample_data['sample_rate']
-                    
-                    detections = self.analyzer.analyze(audio, sample_rate)
+            # This thread only schedules: it collects batches while one
+            # inference thread runs BirdNET, which releases the GIL, on
+            # the previous batch
+            with ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="birdnet"
+            ) as executor:
+                pending = None
+                while True:
+                    try:
+                        batch, stop = self._collect_batch()
+                        
+                        # Keep at most one batch in flight
+                        self._wait_for(pending)
+                        pending = None
+                        
+                        if batch:
+                            pending = executor.submit(
+                                self._process_batch, batch
+                            )
+                        
+                        if stop:
+                            # Poison pill, stop processing
+                            break
                     
-                    # Send detections to queue
-                    if detections:
-                        for detection in detections:
-                            self.detections_queue.put({
-                                'species': detection['species'],
-                                'confidence': detection['confidence'],
-                                'timestamp': timestamp,
-                                'details': {
-                                    'start_time': detection.get('start_time', 0),
-                                    'end_time': detection.get('end_time', 0)
-                                }
-                            })
+                    except Exception as e:
+                        logger.error(f"Error in analyzer loop: {e}")
+                        continue
                 
-                except Empty:
-                    continue
-                except Exception as e:
-                    logger.error(f"Error in analyzer loop: {e}")
-                    continue
+                self._wait_for(pending)
         
         except Exception as e:
             logger.error(f"Analyzer worker failed: {e}")
+            exit_code = 1
         
         finally:
+            self.sample_pool.close()
             logger.info("Analyzer worker stopped")
+            if exit_code:
+                sys.exit(exit_code)
+    
+    def _wait_for(self, pending: Optional[Future]):
+        """Wait for a submitted batch, logging rather than raising errors."""
+        if pending is None:
+            return
+        try:
+            pending.result()
+        except Exception as e:
+            logger.error(f"Error analyzing batch: {e}")
+    
+    def _collect_batch(self) -> tuple[list, bool]:
+        """
+        Collect up to ``batch_size`` samples from the queue.
+        
+        Blocks until the first sample (or a poison pill) arrives, then keeps
+        pulling until the batch is full or ``BATCH_TIMEOUT`` has elapsed.
+        
+        Returns:
+            Tuple of (samples, stop) where stop is True if a poison pill
+            was received
+        """
+        batch = []
+        sample_data = get_blocking(self.samples_queue)
+        if sample_data is None:
+            return batch, True
+        batch.append(sample_data)
+        
+        deadline = time.monotonic() + BATCH_TIMEOUT
+        while len(batch) < self.config.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                sample_data = self.samples_queue.get(timeout=remaining)
+            except Empty:
+                break
+            if sample_data is None:
+                return batch, True
+            batch.append(sample_data)
+        
+        return batch, False
     
-    def start(self) -> threading.Thread:
-        """Start analyzer worker in a thread."""
-        self.running = True
-        thread = threading.Thread(target=self.run, daemon=True)
-        thread.start()
-        return thread
+    def _process_batch(self, batch: list):
+        """Analyze a batch of samples and queue the resulting detections."""
+        try:
+            for sample_data in batch:
+                sample_data['audio'] = self.sample_pool.lease(
+                    sample_data['slot'], sample_data['length']
+                )
+            self._analyze_samples(batch)
+        finally:
+            for sample_data in batch:
+                self.sample_pool.release(sample_data['slot'])
+    
+    def _analyze_samples(self, batch: list):
+        """Run BirdNET over samples whose audio is attached."""
+        # Samples normally share a rate; group just in case they don't
+        by_rate = {}
+        for sample_data in batch:
+            if not self._passes_energy_gate(sample_data['audio']):
+                continue
+            by_rate.setdefault(sample_data['sample_rate'], []).append(sample_data)
+        
+        for sample_rate, samples in by_rate.items():
+            results = self.analyzer.analyze_batch(
+                [s['audio'] for s in samples],
+                sample_rate
+            )
+            
+            # Send detections to queue
+            for sample_data, detections in zip(samples, results):
+                timestamp = sample_data['timestamp']
+                for detection in detections:
+                    self.detections_queue.put({
+                        'species': detection['species'],
+                        'confidence': detection['confidence'],
+                        'timestamp': timestamp,
+                        'details': {
+                            'start_time': detection.get('start_time', 0),
+                            'end_time': detection.get('end_time', 0)
+                        }
+                    })
+    
+    def _passes_energy_gate(self, audio: np.ndarray) -> bool:
+        """Return False for near-silent samples not worth running BirdNET on."""
+        if self.config.min_rms <= 0:
+            return True
+        
+        rms, zcr = audio_features(audio)
+        if rms < self.config.min_rms:
+            logger.debug(
+                f"Skipping quiet sample (rms={rms:.5f}, zcr={zcr:.3f})"
+            )
+            return False
+        return True
     
-    def stop(self):
-        """Stop analyzer worker."""
-        self.running = False
+    def start(self) -> multiprocessing.Process:
+        """Start analyzer worker in its own process."""
+        # spawn, not fork: the parent already runs threads
+        ctx = multiprocessing.get_context("spawn")
+        process = ctx.Process(target=self.run, daemon=True)
+        process.start()
+        return process
@@ -2,15 +2,43 @@
 API server for the listener service.
 Provides REST endpoints for the dashboard.
 """
-from flask import Flask, jsonify, request
+from flask import Flask, Response, request, stream_with_context
+from flask_compress import Compress
 from flask_cors import CORS
+from waitress import serve
 from datetime import datetime, timedelta
 import logging
 from functools import wraps
 
+import orjson
+
 logger = logging.getLogger("magpi-listener")
 
 
+def json_response(payload, status: int = 200) -> Response:
+    """Serialize payload with orjson into a JSON response."""
+    return Response(
+        orjson.dumps(payload),
+        status=status,
+        mimetype='application/json'
+    )
+
+
+def _stream_envelope(items):
+    """
+    Yield a ``{"success", "data", "count"}`` JSON document piece by piece,
+    encoding one item of ``data`` at a time.
+    """
+    yield b'{"success":true,"data":['
+    count = 0
+    for item in items:
+        if count:
+            yield b','
+        yield orjson.dumps(item)
+        count += 1
+    yield b'],"count":' + str(count).encode() + b'}'
+
+
 class ListenerAPI:
     """REST API for the listener service."""
     
@@ -19,6 +47,26 @@ class ListenerAPI:
         self.db = db
         self.app = Flask(__name__)
         CORS(self.app)
+        # Streamed responses (species history) must stay streamed; older
+        # flask-compress versions buffer the whole body to compress it
+        self.app.config['COMPRESS_STREAMS'] = False
+        Compress(self.app)
+        
+        # Configuration is fixed for the life of the process, so the
+        # /api/config body is encoded once up front.
+        self._config_body = orjson.dumps({
+            'success': True,
+            'data': {
+                'audio_device': self.config.audio_device,
+                'sample_rate': self.config.sample_rate,
+                'min_confidence': self.config.min_confidence,
+                'duplicate_window': self.config.duplicate_window,
+                'location': {
+                    'lat': self.config.birdnet_location_lat,
+                    'lon': self.config.birdnet_location_lon,
+                }
+            }
+        })
         
         self._setup_routes()
     
@@ -28,7 +76,7 @@ class ListenerAPI:
         @self.app.route('/health', methods=['GET'])
         def health():
             """Health check endpoint."""
-            return jsonify({
+            return json_response({
                 'status': 'healthy',
                 'timestamp': datetime.utcnow().isoformat()
             })
@@ -43,20 +91,24 @@ class ListenerAPI:
                 
                 if species:
                     detections = self.db.get_detections_by_species(species)
-                else:
-                    detections = self.db.get_recent_detections(limit, offset)
+                    return Response(
+                        stream_with_context(_stream_envelope(detections)),
+                        mimetype='application/json'
+                    )
                 
-                return jsonify({
+                detections = self.db.get_recent_detections(limit, offset)
+                
+                return json_response({
                     'success': True,
                     'data': detections,
                     'count': len(detections)
                 })
             except Exception as e:
                 logger.error(f"Error getting detections: {e}")
-                return jsonify({
+                return json_response({
                     'success': False,
                     'error': str(e)
-                }), 500
+                }, 500)
         
         @self.app.route('/api/stats', methods=['GET'])
         def get_stats():
@@ -65,16 +117,16 @@ class ListenerAPI:
                 days = request.args.get('days', 7, type=int)
                 stats = self.db.get_stats(days)
                 
-                return jsonify({
+                return json_response({
                     'success': True,
                     'data': stats
                 })
             except Exception as e:
                 logger.error(f"Error getting stats: {e}")
-                return jsonify({
+                return json_response({
                     'success': False,
                     'error': str(e)
-                }), 500
+                }, 500)
         
         @self.app.route('/api/species', methods=['GET'])
         def get_species():
@@ -91,17 +143,17 @@ class ListenerAPI:
                     for s in species_list
                 ]
                 
-                return jsonify({
+                return json_response({
                     'success': True,
                     'data': data,
                     'count': len(data)
                 })
             except Exception as e:
                 logger.error(f"Error getting species: {e}")
-                return jsonify({
+                return json_response({
                     'success': False,
                     'error': str(e)
-                }), 500
+                }, 500)
         
         @self.app.route('/api/heatmap', methods=['GET'])
         def get_heatmap():
@@ -110,16 +162,16 @@ class ListenerAPI:
                 days = request.args.get('days', 7, type=int)
                 data = self.db.get_hourly_activity(days)
                 
-                return jsonify({
+                return json_response({
                     'success': True,
                     'data': data
                 })
             except Exception as e:
                 logger.error(f"Error getting heatmap data: {e}")
-                return jsonify({
+                return json_response({
                     'success': False,
                     'error': str(e)
-                }), 500
+                }, 500)
         
         @self.app.route('/api/trends', methods=['GET'])
         def get_trends():
@@ -128,55 +180,34 @@ class ListenerAPI:
                 days = request.args.get('days', 365, type=int)
                 data = self.db.get_daily_activity(days)
                 
-                return jsonify({
+                return json_response({
                     'success': True,
                     'data': data
                 })
             except Exception as e:
                 logger.error(f"Error getting trends: {e}")
-                return jsonify({
+                return json_response({
                     'success': False,
                     'error': str(e)
-                }), 500
+                }, 500)
         
         @self.app.route('/api/config', methods=['GET'])
         def get_config():
             """Get current configuration."""
-            try:
-                config_dict = {
-                    'audio_device': self.config.audio_device,
-                    'sample_rate': self.config.sample_rate,
-                    'min_confidence': self.config.min_confidence,
-                    'duplicate_window': self.config.duplicate_window,
-                    'location': {
-                        'lat': self.config.birdnet_location_lat,
-                        'lon': self.config.birdnet_location_lon,
-                    }
-                }
-                
-                return jsonify({
-                    'success': True,
-                    'data': config_dict
-                })
-            except Exception as e:
-                logger.error(f"Error getting config: {e}")
-                return jsonify({
-                    'success': False,
-                    'error': str(e)
-                }), 500
+            return Response(self._config_body, mimetype='application/json')
         
         @self.app.errorhandler(404)
         def not_found(error):
-            return jsonify({
+            return json_response({
                 'success': False,
                 'error': 'Endpoint not found'
-            }), 404
+            }, 404)
     
     def run(self):
         """Start the API server."""
-        self.app.run(
+        serve(
+            self.app,
             host=self.config.api_host,
             port=self.config.api_port,
-            debug=False,
-            threaded=True
+            threads=8
         )
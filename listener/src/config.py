@@ -8,7 +8,7 @@ from typing import Optional
 import logging
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ListenerConfig:
     """Configuration for the listener service."""
     
@@ -22,9 +22,11 @@ class ListenerConfig:
     # Detection Settings
     min_confidence: float = 0.5
     duplicate_window: int = 30  # seconds to ignore duplicates
+    min_rms: float = 0.0  # skip samples quieter than this (0 = disabled)
     
     # Worker Settings
     num_workers: int = 2
+    batch_size: int = 4  # max samples per BirdNET pass
     
     # Database Settings
     db_path: str = "./data/detections.db"
@@ -34,6 +36,8 @@ class ListenerConfig:
     birdnet_gpu: bool = False
     birdnet_location_lat: float = 40.7128
     birdnet_location_lon: float = -74.0060
+    birdnet_model_path: str = ""  # empty = bundled BirdNET-Lite model
+    birdnet_labels_path: str = ""
     
     # API Settings
     api_port: int = 8000
@@ -43,7 +47,7 @@ class ListenerConfig:
     log_level: str = "INFO"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class DatabaseConfig:
     """Configuration for database."""
     
@@ -65,17 +69,41 @@ def load_config() -> tuple[ListenerConfig, DatabaseConfig]:
         sample_duration=int(os.getenv("LISTENER_SAMPLE_DURATION", "5")),
         min_confidence=float(os.getenv("LISTENER_MIN_CONFIDENCE", "0.5")),
         duplicate_window=int(os.getenv("LISTENER_DUPLICATE_WINDOW", "30")),
+        min_rms=float(os.getenv("LISTENER_MIN_RMS", "0.0")),
         num_workers=int(os.getenv("LISTENER_NUM_WORKERS", "2")),
+        batch_size=int(os.getenv("LISTENER_BATCH_SIZE", "4")),
         db_path=os.getenv("LISTENER_DB_PATH", "./data/detections.db"),
         birdnet_threads=int(os.getenv("BIRDNET_THREADS", "4")),
         birdnet_gpu=os.getenv("BIRDNET_GPU", "false").lower() == "true",
         birdnet_location_lat=float(os.getenv("BIRDNET_LOCATION_LAT", "40.7128")),
         birdnet_location_lon=float(os.getenv("BIRDNET_LOCATION_LON", "-74.0060")),
+        birdnet_model_path=os.getenv("BIRDNET_MODEL_PATH", ""),
+        birdnet_labels_path=os.getenv("BIRDNET_LABELS_PATH", ""),
         api_port=int(os.getenv("API_SERVER_PORT", "8000")),
         api_host=os.getenv("API_SERVER_HOST", "0.0.0.0"),
         log_level=os.getenv("LISTENER_LOG_LEVEL", "INFO"),
     )
     
+    # The ring must hold a full sample plus headroom for chunks written
+    # while a sample is being copied out of it
+    headroom = 2 * listener_config.chunk_size
+    if (listener_config.buffer_duration * listener_config.sample_rate
+            < listener_config.sample_duration * listener_config.sample_rate
+            + headroom):
+        raise ValueError(
+            f"LISTENER_BUFFER_DURATION ({listener_config.buffer_duration}s) "
+            f"must exceed LISTENER_SAMPLE_DURATION "
+            f"({listener_config.sample_duration}s) by at least "
+            f"{headroom} samples (two LISTENER_CHUNK_SIZE chunks)"
+        )
+    
+    # A custom model is useless without its labels, and vice versa
+    if (bool(listener_config.birdnet_model_path)
+            != bool(listener_config.birdnet_labels_path)):
+        raise ValueError(
+            "BIRDNET_MODEL_PATH and BIRDNET_LABELS_PATH must be set together"
+        )
+    
     db_config = DatabaseConfig(
         db_path=os.getenv("DATABASE_PATH", listener_config.db_path),
         cleanup_enabled=os.getenv("CLEANUP_ENABLED", "true").lower() == "true",
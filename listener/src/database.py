@@ -1,16 +1,119 @@
 """
 Database management for storing bird detections.
 """
+import ast
 import sqlite3
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 import logging
+import queue
 import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import orjson
 
 logger = logging.getLogger("magpi-listener")
 
 
+def _encode_details(details: Optional[Dict]) -> Optional[str]:
+    """Serialize detection details to JSON text for storage."""
+    return orjson.dumps(details).decode('utf-8') if details else None
+
+
+def _decode_details(value) -> Optional[Dict]:
+    """Parse stored detection details (JSON; see _migrate_schema)."""
+    if not value:
+        return None
+    try:
+        return orjson.loads(value)
+    except orjson.JSONDecodeError:
+        return None
+
+
+def _legacy_details_to_json(text: str) -> str:
+    """
+    Convert details stored as a Python repr to JSON text.
+    
+    Anything literal_eval cannot parse is kept verbatim as a JSON string,
+    so no stored data is lost.
+    """
+    try:
+        value = ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        value = text
+    try:
+        return orjson.dumps(value).decode('utf-8')
+    except TypeError:
+        return orjson.dumps(text).decode('utf-8')
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _to_epoch_us(ts: datetime) -> int:
+    """Microseconds since the epoch for a UTC datetime (naive means UTC)."""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return (ts - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_epoch_us(value: int) -> str:
+    """Format a stored epoch-microsecond timestamp as naive UTC ISO 8601."""
+    return (_EPOCH + timedelta(microseconds=value)).isoformat()
+
+
+def ttl_cache(seconds: float, maxsize: int = 16):
+    """Memoize a function's results for ``seconds``, keyed on its arguments."""
+    
+    def decorator(func):
+        cache = {}
+        lock = threading.Lock()
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = args + tuple(sorted(kwargs.items()))
+            now = time.monotonic()
+            with lock:
+                hit = cache.get(key)
+            if hit is not None and now - hit[0] < seconds:
+                return hit[1]
+            
+            value = func(*args, **kwargs)
+            with lock:
+                if len(cache) >= maxsize:
+                    cache.clear()
+                cache[key] = (now, value)
+            return value
+        
+        return wrapper
+    
+    return decorator
+
+
+# Column order expected by _row_to_detection
+_DETECTION_COLUMNS = (
+    "id, species, confidence, timestamp, latitude, longitude, details, "
+    "created_at"
+)
+
+
+def _row_to_detection(row: tuple) -> Dict:
+    """Convert a detections row (in _DETECTION_COLUMNS order) to a dict."""
+    return {
+        'id': row[0],
+        'species': row[1],
+        'confidence': row[2],
+        'timestamp': _from_epoch_us(row[3]),
+        'latitude': row[4],
+        'longitude': row[5],
+        'details': _decode_details(row[6]),
+        'created_at': row[7],
+    }
+
+
 class Detection:
     """Represents a bird detection."""
     
@@ -28,14 +131,48 @@ class DetectionDatabase:
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.lock = threading.RLock()
+        
+        # Lists of rows handed to the writer thread, which batch-inserts up to
+        # _flush_size rows or whatever arrived within _flush_interval
+        self._write_q = queue.SimpleQueue()
+        self._flush_size = 64
+        self._flush_interval = 0.5  # seconds
+        
+        # Latest detection timestamp (epoch us) per species, for the
+        # duplicate check in add_detections_bulk; loaded once at startup
+        # and kept current from then on, so it never queries SQLite
+        self._last_seen: Dict[str, int] = {}
+        self._seen_lock = threading.Lock()
+        
+        # Seconds a stats_cache entry is served before being recomputed
+        self._stats_ttl = 60
+        # Bumped under self.lock whenever detections change, so _cached
+        # can tell that a value it computed is already stale
+        self._write_gen = 0
+        
         self._init_db()
+        self._load_last_seen()
+        
+        self._writer = threading.Thread(
+            target=self._writer_loop,
+            name="DetectionDbWriter",
+            daemon=True
+        )
+        self._writer.start()
     
     def _init_db(self):
         """Initialize the database schema."""
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        # Writer connection, shared and guarded by self.lock. Readers check
+        # out a pooled connection (see _reading) and never take the lock;
+        # WAL lets them run alongside the writer.
+        self._conn = self._connect()
+        self._readers = queue.SimpleQueue()
+        
+        with self.lock:
+            cursor = self._conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
             
             # Detections table
             cursor.execute("""
@@ -43,14 +180,18 @@ class DetectionDatabase:
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     species TEXT NOT NULL,
                     confidence REAL NOT NULL,
-                    timestamp DATETIME NOT NULL,
+                    timestamp INTEGER NOT NULL,
                     latitude REAL,
                     longitude REAL,
                     details TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    hour_bucket INTEGER,
+                    day_bucket INTEGER
                 )
             """)
             
+            self._migrate_schema(cursor)
+            
             # Indexes for common queries
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_species ON detections(species)
@@ -62,6 +203,11 @@ class DetectionDatabase:
                 CREATE INDEX IF NOT EXISTS idx_species_timestamp 
                 ON detections(species, timestamp)
             """)
+            # Covering index for heatmap/trend grouping
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_buckets 
+                ON detections(day_bucket, hour_bucket, confidence)
+            """)
             
             # Statistics cache table
             cursor.execute("""
@@ -73,233 +219,495 @@ class DetectionDatabase:
                 )
             """)
             
-            conn.commit()
             logger.info(f"Database initialized at {self.db_path}")
     
-    def add_detection(self, detection: Detection, lat: Optional[float] = None,
-                     lon: Optional[float] = None) -> int:
-        """Add a detection to the database."""
+    def _migrate_schema(self, cursor: sqlite3.Cursor):
+        """Bring a database created by an older version up to date."""
+        
+        cursor.execute("PRAGMA table_info(detections)")
+        columns = {row[1] for row in cursor.fetchall()}
+        
+        if 'hour_bucket' not in columns:
+            logger.info("Adding hour/day bucket columns to detections")
+            cursor.execute("BEGIN")
+            cursor.execute(
+                "ALTER TABLE detections ADD COLUMN hour_bucket INTEGER"
+            )
+            cursor.execute(
+                "ALTER TABLE detections ADD COLUMN day_bucket INTEGER"
+            )
+            cursor.execute("""
+                UPDATE detections SET
+                    hour_bucket = CAST(strftime('%s', timestamp) AS INTEGER) / 3600,
+                    day_bucket = CAST(strftime('%s', timestamp) AS INTEGER) / 86400
+            """)
+            cursor.execute("COMMIT")
+        
+        # Timestamps used to be stored as ISO 8601 text
+        cursor.execute(
+            "SELECT 1 FROM detections WHERE typeof(timestamp) = 'text' LIMIT 1"
+        )
+        if cursor.fetchone():
+            logger.info("Converting detection timestamps to epoch microseconds")
+            cursor.execute("BEGIN")
+            cursor.execute("""
+                UPDATE detections SET timestamp =
+                    CAST(strftime('%s', timestamp) AS INTEGER) * 1000000
+                    + CAST(substr(timestamp, 21, 6) AS INTEGER)
+                WHERE typeof(timestamp) = 'text'
+            """)
+            cursor.execute("COMMIT")
+        
+        # Details used to be stored as the Python repr of a dict
+        cursor.execute("""
+            SELECT id, details FROM detections
+            WHERE details IS NOT NULL AND NOT json_valid(details)
+        """)
+        legacy = cursor.fetchall()
+        if legacy:
+            logger.info(
+                f"Converting details of {len(legacy)} detections to JSON"
+            )
+            cursor.execute("BEGIN")
+            cursor.executemany(
+                "UPDATE detections SET details = ? WHERE id = ?",
+                [(_legacy_details_to_json(text), row_id)
+                 for row_id, text in legacy]
+            )
+            cursor.execute("COMMIT")
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a tuned autocommit connection to the database."""
+        
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None
+        )
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        return conn
+    
+    @contextmanager
+    def _reading(self) -> Iterator[sqlite3.Connection]:
+        """
+        Check out a read connection from the pool.
+        
+        Idle connections are reused by whichever thread asks next; a new
+        one is opened only when all are in use, so the pool settles at
+        the peak number of concurrent readers.
+        """
+        
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+    
+    def _checkout(self) -> sqlite3.Connection:
+        """Take an idle read connection, opening one if none is idle."""
+        
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            return self._connect()
+    
+    def _make_row(self, detection: Detection, lat: Optional[float],
+                  lon: Optional[float]) -> tuple:
+        """Build the insert row for a detection."""
+        
+        ts = _to_epoch_us(detection.timestamp)
+        epoch = ts // 1_000_000
+        return (
+            str(detection.species),
+            float(detection.confidence),
+            ts,
+            float(lat) if lat is not None else None,
+            float(lon) if lon is not None else None,
+            _encode_details(detection.details),
+            epoch // 3600,
+            epoch // 86400
+        )
+    
+    def add_detections_bulk(self, detections: Iterable[Detection],
+                            lat: Optional[float] = None,
+                            lon: Optional[float] = None,
+                            duplicate_window: Optional[int] = None
+                            ) -> List[Detection]:
+        """
+        Queue several detections to be inserted in one transaction.
+        
+        With ``duplicate_window`` set, a detection is dropped when its
+        species was already seen within that many seconds of it. The check
+        and the last-seen update happen under one lock, so there is no
+        gap between checking and inserting for another caller to slip a
+        duplicate into.
+        
+        Returns:
+            The detections that were queued
+        """
+        
+        window_us = (
+            duplicate_window * 1_000_000 if duplicate_window is not None
+            else None
+        )
+        accepted = []
+        rows = []
+        
+        with self._seen_lock:
+            last_seen = self._last_seen
+            for detection in detections:
+                row = self._make_row(detection, lat, lon)
+                species, ts = row[0], row[2]
+                previous = last_seen.get(species)
+                
+                if (window_us is not None and previous is not None
+                        and previous >= ts - window_us):
+                    continue
+                
+                if previous is None or ts > previous:
+                    last_seen[species] = ts
+                accepted.append(detection)
+                rows.append(row)
+        
+        if rows:
+            self._write_q.put(rows)
+        return accepted
+    
+    def flush(self, timeout: float = 5.0):
+        """Block until every detection queued so far has been written."""
+        
+        done = threading.Event()
+        self._write_q.put(done)
+        if not done.wait(timeout):
+            logger.warning("Timed out waiting for detections to be written")
+    
+    def _writer_loop(self):
+        """Drain the write queue and insert rows in batches."""
+        
+        while True:
+            item = self._write_q.get()
+            rows = []
+            waiters = []
+            deadline = time.monotonic() + self._flush_interval
+            
+            while True:
+                if isinstance(item, threading.Event):
+                    # flush() marker: write what we have right away
+                    waiters.append(item)
+                    break
+                rows.extend(item)
+                
+                remaining = deadline - time.monotonic()
+                if len(rows) >= self._flush_size or remaining <= 0:
+                    break
+                try:
+                    item = self._write_q.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            
+            if rows:
+                try:
+                    self._write_rows(rows)
+                except Exception as e:
+                    logger.error(f"Error writing {len(rows)} detections: {e}")
+                    self._forget_rows(rows)
+            
+            for waiter in waiters:
+                waiter.set()
+    
+    def _write_rows(self, rows: List[tuple]):
+        """Insert rows in a single transaction."""
         
         with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
+            cursor = self._conn.cursor()
+            try:
+                cursor.execute("BEGIN")
+                cursor.executemany("""
                     INSERT INTO detections 
-                    (species, confidence, timestamp, latitude, longitude, details)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    str(detection.species),
-                    float(detection.confidence),
-                    str(detection.timestamp.isoformat()),
-                    float(lat) if lat is not None else None,
-                    float(lon) if lon is not None else None,
-                    str(detection.details) if detection.details else None
-                ))
-                conn.commit()
-                return cursor.lastrowid
+                    (species, confidence, timestamp, latitude, longitude,
+                     details, hour_bucket, day_bucket)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                # New rows make every cached aggregate stale
+                cursor.execute("DELETE FROM stats_cache")
+                cursor.execute("COMMIT")
+                self._write_gen += 1
+                logger.debug(f"Wrote {len(rows)} detections")
+            except Exception:
+                # BEGIN itself may have failed; don't mask the error
+                if self._conn.in_transaction:
+                    cursor.execute("ROLLBACK")
+                raise
+    
+    def _forget_rows(self, rows: List[tuple]):
+        """
+        Undo the last-seen updates of rows that failed to insert, so they
+        don't suppress later detections as duplicates of nothing.
+        
+        A species whose last-seen time has since moved on to a newer,
+        still pending detection is left alone.
+        """
+        
+        failed: Dict[str, set] = {}
+        for row in rows:
+            failed.setdefault(row[0], set()).add(row[2])
+        
+        try:
+            placeholders = ",".join("?" * len(failed))
+            with self._reading() as conn:
+                latest = dict(conn.execute(f"""
+                    SELECT species, MAX(timestamp) FROM detections
+                    WHERE species IN ({placeholders})
+                    GROUP BY species
+                """, list(failed)).fetchall())
+        except sqlite3.Error:
+            # Nothing better to go on; forgetting only errs towards
+            # accepting the next detection
+            latest = {}
+        
+        with self._seen_lock:
+            for species, stamps in failed.items():
+                if self._last_seen.get(species) not in stamps:
+                    continue
+                if species in latest:
+                    self._last_seen[species] = latest[species]
+                else:
+                    self._last_seen.pop(species, None)
     
     def get_recent_detections(self, limit: int = 100, 
                             offset: int = 0) -> List[Dict]:
         """Get recent detections."""
         
-        with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT * FROM detections 
-                    ORDER BY timestamp DESC 
-                    LIMIT ? OFFSET ?
-                """, (limit, offset))
-                
-                rows = cursor.fetchall()
-                result = []
-                for row in rows:
-                    d = dict(row)
-                    if d.get('details') and isinstance(d['details'], bytes):
-                        try:
-                            d['details'] = d['details'].decode('utf-8')
-                        except:
-                            d['details'] = None
-                    result.append(d)
-                return result
+        with self._reading() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {_DETECTION_COLUMNS} FROM detections 
+                ORDER BY timestamp DESC 
+                LIMIT ? OFFSET ?
+            """, (limit, offset))
+            
+            return [_row_to_detection(row) for row in cursor.fetchall()]
     
     def get_detections_by_species(self, species: str, 
-                                 days: int = 7) -> List[Dict]:
-        """Get detections for a specific species in the last N days."""
+                                 days: int = 7) -> Iterator[Dict]:
+        """
+        Get detections for a specific species in the last N days.
         
-        with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                since = datetime.utcnow() - timedelta(days=days)
-                
-                cursor.execute("""
-                    SELECT * FROM detections 
-                    WHERE species = ? AND timestamp >= ?
-                    ORDER BY timestamp DESC
-                """, (species, since.isoformat()))
-                
-                rows = cursor.fetchall()
-                result = []
-                for row in rows:
-                    d = dict(row)
-                    if d.get('details') and isinstance(d['details'], bytes):
-                        try:
-                            d['details'] = d['details'].decode('utf-8')
-                        except:
-                            d['details'] = None
-                    result.append(d)
-                return result
+        The query runs immediately, so errors are raised here, but rows
+        are fetched and converted lazily as the returned iterator is
+        consumed, so long histories are never held in memory all at once.
+        The iterator holds a pooled connection until it is exhausted or
+        closed.
+        """
+        
+        since = _to_epoch_us(datetime.utcnow() - timedelta(days=days))
+        
+        conn = self._checkout()
+        try:
+            cursor = conn.execute(f"""
+                SELECT {_DETECTION_COLUMNS} FROM detections 
+                WHERE species = ? AND timestamp >= ?
+                ORDER BY timestamp DESC
+            """, (species, since))
+        except Exception:
+            self._readers.put(conn)
+            raise
+        
+        return self._iter_detections(conn, cursor)
     
+    def _iter_detections(self, conn: sqlite3.Connection,
+                         cursor: sqlite3.Cursor) -> Iterator[Dict]:
+        """Convert rows from an executed query, then return its connection."""
+        
+        try:
+            for row in cursor:
+                yield _row_to_detection(row)
+        finally:
+            cursor.close()
+            self._readers.put(conn)
+    
+    @ttl_cache(seconds=30)
     def get_all_species(self, days: int = 7) -> List[Tuple[str, int]]:
         """Get all detected species with counts for the last N days."""
         
+        with self._reading() as conn:
+            cursor = conn.cursor()
+            
+            since = _to_epoch_us(datetime.utcnow() - timedelta(days=days))
+            
+            cursor.execute("""
+                SELECT species, COUNT(*) as count 
+                FROM detections 
+                WHERE timestamp >= ?
+                GROUP BY species 
+                ORDER BY count DESC
+            """, (since,))
+            
+            return cursor.fetchall()
+    
+    def _cached(self, key: str, compute):
+        """
+        Return the stats_cache value for key, recomputing it via compute()
+        when missing or older than the TTL.
+        """
+        
+        with self._reading() as conn:
+            row = conn.execute("""
+                SELECT value FROM stats_cache 
+                WHERE key = ? AND updated_at >= datetime('now', ?)
+            """, (key, f"-{self._stats_ttl} seconds")).fetchone()
+        if row:
+            return orjson.loads(row[0])
+        
+        gen = self._write_gen
+        value = compute()
         with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                since = datetime.utcnow() - timedelta(days=days)
-                
-                cursor.execute("""
-                    SELECT species, COUNT(*) as count 
-                    FROM detections 
-                    WHERE timestamp >= ?
-                    GROUP BY species 
-                    ORDER BY count DESC
-                """, (since.isoformat(),))
-                
-                return cursor.fetchall()
+            if self._write_gen != gen:
+                # Detections changed while computing; serve this value but
+                # don't cache it past the writer's invalidation
+                return value
+            self._conn.execute("""
+                INSERT INTO stats_cache (key, value, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(key) DO UPDATE SET 
+                    value = excluded.value,
+                    updated_at = excluded.updated_at
+            """, (key, orjson.dumps(value).decode('utf-8')))
+        return value
     
     def get_stats(self, days: int = 7) -> Dict:
         """Get overall statistics."""
         
-        with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                since = datetime.utcnow() - timedelta(days=days)
-                
-                # Total detections
-                cursor.execute("""
-                    SELECT COUNT(*) FROM detections WHERE timestamp >= ?
-                """, (since.isoformat(),))
-                total_detections = cursor.fetchone()[0]
-                
-                # Unique species
-                cursor.execute("""
-                    SELECT COUNT(DISTINCT species) FROM detections 
-                    WHERE timestamp >= ?
-                """, (since.isoformat(),))
-                unique_species = cursor.fetchone()[0]
-                
-                # Average confidence
-                cursor.execute("""
-                    SELECT AVG(confidence) FROM detections 
-                    WHERE timestamp >= ?
-                """, (since.isoformat(),))
-                avg_confidence = cursor.fetchone()[0] or 0
-                
-                # Top species
-                cursor.execute("""
-                    SELECT species, COUNT(*) as count 
-                    FROM detections 
-                    WHERE timestamp >= ?
-                    GROUP BY species 
-                    ORDER BY count DESC 
-                    LIMIT 10
-                """, (since.isoformat(),))
-                top_species = [{"species": row[0], "count": row[1]} 
-                               for row in cursor.fetchall()]
-                
-                return {
-                    "total_detections": total_detections,
-                    "unique_species": unique_species,
-                    "avg_confidence": round(avg_confidence, 3),
-                    "top_species": top_species,
-                    "period_days": days
-                }
+        return self._cached(f"stats_{days}", lambda: self._compute_stats(days))
     
-    def check_duplicate(self, species: str, window_seconds: int) -> bool:
-        """Check if a recent detection of this species exists within window."""
+    def _compute_stats(self, days: int) -> Dict:
+        """Compute overall statistics from the detections table."""
         
-        with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                since = datetime.utcnow() - timedelta(seconds=window_seconds)
-                
-                cursor.execute("""
-                    SELECT COUNT(*) FROM detections 
-                    WHERE species = ? AND timestamp >= ?
-                    LIMIT 1
-                """, (species, since.isoformat()))
-                
-                count = cursor.fetchone()[0]
-                return count > 0
+        with self._reading() as conn:
+            cursor = conn.cursor()
+            
+            since = _to_epoch_us(datetime.utcnow() - timedelta(days=days))
+            
+            # Totals, unique species and average confidence in one scan
+            cursor.execute("""
+                SELECT COUNT(*), COUNT(DISTINCT species), AVG(confidence)
+                FROM detections 
+                WHERE timestamp >= ?
+            """, (since,))
+            total_detections, unique_species, avg_confidence = cursor.fetchone()
+            avg_confidence = avg_confidence or 0
+            
+            # Top species
+            cursor.execute("""
+                SELECT species, COUNT(*) as count 
+                FROM detections 
+                WHERE timestamp >= ?
+                GROUP BY species 
+                ORDER BY count DESC 
+                LIMIT 10
+            """, (since,))
+            top_species = [{"species": row[0], "count": row[1]} 
+                           for row in cursor.fetchall()]
+            
+            return {
+                "total_detections": total_detections,
+                "unique_species": unique_species,
+                "avg_confidence": round(avg_confidence, 3),
+                "top_species": top_species,
+                "period_days": days
+            }
+    
+    def _load_last_seen(self):
+        """Seed the in-memory last-seen map from existing detections."""
+        
+        with self._reading() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT species, MAX(timestamp) FROM detections GROUP BY species
+            """)
+            with self._seen_lock:
+                self._last_seen.update(cursor.fetchall())
     
     def cleanup_old_detections(self, days: int = 90):
         """Remove detections older than N days."""
         
         with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cutoff = datetime.utcnow() - timedelta(days=days)
-                
-                cursor.execute("""
-                    DELETE FROM detections WHERE timestamp < ?
-                """, (cutoff.isoformat(),))
-                
-                deleted = cursor.rowcount
-                conn.commit()
-                
-                if deleted > 0:
-                    logger.info(f"Cleaned up {deleted} old detections")
+            cursor = self._conn.cursor()
+            
+            cutoff = _to_epoch_us(datetime.utcnow() - timedelta(days=days))
+            
+            cursor.execute("""
+                DELETE FROM detections WHERE timestamp < ?
+            """, (cutoff,))
+            
+            deleted = cursor.rowcount
+            
+            if deleted > 0:
+                cursor.execute("DELETE FROM stats_cache")
+                self._write_gen += 1
+                logger.info(f"Cleaned up {deleted} old detections")
     
     def get_hourly_activity(self, days: int = 7) -> List[Dict]:
         """Get hourly activity data for heatmap visualization."""
         
-        with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                since = datetime.utcnow() - timedelta(days=days)
-                
-                cursor.execute("""
-                    SELECT 
-                        strftime('%Y-%m-%d %H:00:00', timestamp) as hour,
-                        COUNT(*) as count,
-                        AVG(confidence) as avg_confidence
-                    FROM detections 
-                    WHERE timestamp >= ?
-                    GROUP BY hour
-                    ORDER BY hour
-                """, (since.isoformat(),))
-                
-                return [dict(row) for row in cursor.fetchall()]
+        return self._cached(
+            f"hourly_{days}", lambda: self._compute_hourly_activity(days)
+        )
+    
+    def _compute_hourly_activity(self, days: int) -> List[Dict]:
+        """Aggregate detections per hour from the detections table."""
+        
+        with self._reading() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            
+            since = _to_epoch_us(
+                datetime.utcnow() - timedelta(days=days)
+            ) // 1_000_000
+            
+            cursor.execute("""
+                SELECT 
+                    strftime('%Y-%m-%d %H:00:00', hour_bucket * 3600, 'unixepoch')
+                        as hour,
+                    COUNT(*) as count,
+                    AVG(confidence) as avg_confidence
+                FROM detections 
+                WHERE day_bucket >= ? AND hour_bucket >= ?
+                GROUP BY day_bucket, hour_bucket
+                ORDER BY day_bucket, hour_bucket
+            """, (since // 86400, since // 3600))
+            
+            return [dict(row) for row in cursor.fetchall()]
     
     def get_daily_activity(self, days: int = 365) -> List[Dict]:
         """Get daily activity data for trends."""
         
-        with self.lock:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                since = datetime.utcnow() - timedelta(days=days)
-                
-                cursor.execute("""
-                    SELECT 
-                        strftime('%Y-%m-%d', timestamp) as date,
-                        COUNT(*) as count,
-                        COUNT(DISTINCT species) as unique_species
-                    FROM detections 
-                    WHERE timestamp >= ?
-                    GROUP BY date
-                    ORDER BY date
-                """, (since.isoformat(),))
-                
-                return [dict(row) for row in cursor.fetchall()]
+        return self._cached(
+            f"daily_{days}", lambda: self._compute_daily_activity(days)
+        )
+    
+    def _compute_daily_activity(self, days: int) -> List[Dict]:
+        """Aggregate detections per day from the detections table."""
+        
+        with self._reading() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            
+            since = _to_epoch_us(
+                datetime.utcnow() - timedelta(days=days)
+            ) // 1_000_000
+            
+            cursor.execute("""
+                SELECT 
+                    strftime('%Y-%m-%d', day_bucket * 86400, 'unixepoch') as date,
+                    COUNT(*) as count,
+                    COUNT(DISTINCT species) as unique_species
+                FROM detections 
+                WHERE day_bucket >= ?
+                GROUP BY day_bucket
+                ORDER BY day_bucket
+            """, (since // 86400,))
+            
+            return [dict(row) for row in cursor.fetchall()]
@@ -2,11 +2,13 @@
 Database writer worker for storing detections.
 """
 from queue import Queue, Empty
+from typing import List, Tuple
 import logging
 import threading
 from datetime import datetime
 
 from database import Detection, DetectionDatabase
+from queues import get_blocking
 
 logger = logging.getLogger("magpi-listener")
 
@@ -19,7 +21,7 @@ class DbWriterWorker:
         self.config = config
         self.db = db
         self.detections_queue = detections_queue
-        self.running = False
+        self._stop = threading.Event()
         self.lat = config.birdnet_location_lat
         self.lon = config.birdnet_location_lon
     
@@ -28,52 +30,22 @@ class DbWriterWorker:
         try:
             logger.info("Database writer worker started")
             
-            while self.running:
+            while not self._stop.is_set():
                 try:
-                    # Get detection from queue with timeout
-                    detection_data = self.detections_queue.get(timeout=1)
+                    # Wait for one detection, then take whatever else
+                    # is already queued so it is handled as one batch.
+                    # Shutdown arrives as a poison pill, so there is no
+                    # need to wake up periodically.
+                    detection_data = get_blocking(self.detections_queue)
+                    batch, stop = self._drain(detection_data)
                     
-                    if detection_data is None:
+                    if batch:
+                        self._write_batch(batch)
+                    
+                    if stop:
                         # Poison pill, stop processing
                         break
-                    
-                    # Check for duplicates
-                    species = detection_data['species']
-                    confidence = detection_data['confidence']
-                    timestamp = detection_data['timestamp']
-                    
-                    if self.db.check_duplicate(
-                        species, 
-                        self.config.duplicate_window
-                    ):
-                        logger.debug(
-                            f"Ignoring duplicate detection: {species} "
-                            f"(within {self.config.duplicate_window}s)"
-                        )
-                        continue
-                    
-                    # Create detection and save
-                    detection = Detection(
-                        species=species,
-                        confidence=confidence,
-                        timestamp=timestamp,
-                        details=detection_data.get('details', {})
-                    )
-                    
-                    detection_id = self.db.add_detection(
-                        detection,
-                        lat=self.lat,
-                        lon=self.lon
-                    )
-                    
-                    logger.info(
-                        f"Detection saved: {species} "
-                        f"(confidence: {confidence:.2f}) "
-                        f"[ID: {detection_id}]"
-                    )
                 
-                except Empty:
-                    continue
                 except Exception as e:
                     logger.error(f"Error in writer loop: {e}")
                     continue
@@ -84,13 +56,57 @@ class DbWriterWorker:
         finally:
             logger.info("Database writer worker stopped")
     
+    def _drain(self, first) -> Tuple[List[dict], bool]:
+        """Collect ``first`` plus everything already waiting in the queue."""
+        
+        batch = []
+        item = first
+        while True:
+            if item is None:
+                return batch, True
+            batch.append(item)
+            try:
+                item = self.detections_queue.get_nowait()
+            except Empty:
+                return batch, False
+    
+    def _write_batch(self, batch: List[dict]):
+        """Save a batch, letting the database drop duplicates."""
+        
+        saved = self.db.add_detections_bulk(
+            [
+                Detection(
+                    species=detection_data['species'],
+                    confidence=detection_data['confidence'],
+                    timestamp=detection_data['timestamp'],
+                    details=detection_data.get('details', {})
+                )
+                for detection_data in batch
+            ],
+            lat=self.lat,
+            lon=self.lon,
+            duplicate_window=self.config.duplicate_window
+        )
+        
+        if len(saved) < len(batch):
+            logger.debug(
+                f"Ignored {len(batch) - len(saved)} duplicate detections "
+                f"(within {self.config.duplicate_window}s)"
+            )
+        
+        for detection in saved:
+            logger.info(
+                f"Detection saved: {detection.species} "
+                f"(confidence: {detection.confidence:.2f})"
+            )
+    
     def start(self) -> threading.Thread:
         """Start writer worker in a thread."""
-        self.running = True
+        self._stop.clear()
         thread = threading.Thread(target=self.run, daemon=True)
         thread.start()
         return thread
     
     def stop(self):
-        """Stop writer worker."""
-        self.running = False
+        """Stop writer worker (the caller also queues a poison pill)."""
+        self._stop.set()
@@ -2,16 +2,27 @@
 import signal
 import sys
 import logging
-from queue import Queue
+import multiprocessing
 from threading import Thread
 import time
+from collections import deque
 
 from config import load_config, setup_logging
 from database import DetectionDatabase
 from recorder import RecorderWorker
-from analyzer import AnalyzerWorker
+from analyzer import AnalyzerWorker, EXIT_MODEL_LOAD_FAILED
 from db_writer import DbWriterWorker
 from api import ListenerAPI
+from queues import make_queue
+from sample_pool import SamplePool
+
+# Seconds between checks that the analyzer processes are still alive
+ANALYZER_CHECK_INTERVAL = 5.0
+
+# An analyzer that dies more than this many times within the window is
+# given up on instead of being restarted again
+ANALYZER_MAX_RESTARTS = 3
+ANALYZER_RESTART_WINDOW = 300.0  # seconds
 
 
 class ListenerService:
@@ -21,17 +32,36 @@ class ListenerService:
         self.logger.info("Initializing Listener Service...")
         
         self.db = DetectionDatabase(self.db_config.db_path)
-        self.samples_queue = Queue(maxsize=100)
-        self.detections_queue = Queue(maxsize=100)
+        # Analyzers run in their own processes for true parallelism, so the
+        # queues are multiprocessing queues and audio travels through a
+        # shared-memory pool instead of being pickled.
+        ctx = multiprocessing.get_context("spawn")
+        self.ctx = ctx
+        num_workers = self.listener_config.num_workers
+        self.sample_pool = SamplePool(
+            ctx,
+            num_slots=num_workers * (self.listener_config.batch_size + 2),
+            slot_size=(self.listener_config.sample_rate
+                       * self.listener_config.sample_duration)
+        )
+        # One samples queue per analyzer so workers never contend on a
+        # shared queue lock; the recorder deals samples out round-robin.
+        self.samples_queues = [make_queue(ctx) for _ in range(num_workers)]
+        self.detections_queue = make_queue(ctx)
         
-        self.recorder = RecorderWorker(self.listener_config, self.samples_queue)
+        self.recorder = RecorderWorker(
+            self.listener_config,
+            self.samples_queues,
+            self.sample_pool
+        )
         self.analyzers = [
             AnalyzerWorker(
                 self.listener_config,
-                self.samples_queue,
-                self.detections_queue
+                samples_queue,
+                self.detections_queue,
+                self.sample_pool
             )
-            for _ in range(self.listener_config.num_workers)
+            for samples_queue in self.samples_queues
         ]
         self.db_writer = DbWriterWorker(
             self.listener_config,
@@ -41,6 +71,11 @@ class ListenerService:
         
         self.api = ListenerAPI(self.listener_config, self.db)
         self.threads = []
+        self.db_writer_thread = None
+        self.analyzer_processes = []
+        # Death times per analyzer, and analyzers given up on
+        self._analyzer_deaths = [deque() for _ in self.analyzers]
+        self._retired_analyzers = set()
         self.running = True
         
         # Setup signal handlers
@@ -69,15 +104,16 @@ class ListenerService:
             recorder_thread.start()
             self.threads.append(recorder_thread)
             
-            # Start analyzer workers
+            # Start analyzer worker processes
             for i, analyzer in enumerate(self.analyzers):
-                analyzer_thread = analyzer.start()
-                analyzer_thread.name = f"AnalyzerWorker-{i+1}"
-                self.threads.append(analyzer_thread)
+                analyzer_process = analyzer.start()
+                analyzer_process.name = f"AnalyzerWorker-{i+1}"
+                self.analyzer_processes.append(analyzer_process)
             
             # Start database writer
             db_writer_thread = self.db_writer.start()
             db_writer_thread.name = "DbWriterWorker"
+            self.db_writer_thread = db_writer_thread
             self.threads.append(db_writer_thread)
             
             # Start API server in thread
@@ -96,16 +132,81 @@ class ListenerService:
                 f"{self.listener_config.api_port}"
             )
             
-            # Wait for threads
-            for thread in self.threads:
-                if not thread.daemon:
-                    thread.join()
+            # Wait for the recorder, restarting analyzers that die
+            while recorder_thread.is_alive():
+                recorder_thread.join(timeout=ANALYZER_CHECK_INTERVAL)
+                if self.running:
+                    self._check_analyzers()
         
         except Exception as e:
             self.logger.error(f"Error starting service: {e}")
             self.stop()
             raise
     
+    def _check_analyzers(self):
+        """
+        Replace analyzer processes that have died.
+        
+        A dead analyzer would otherwise keep being dealt samples and pin
+        their pool slots forever, until the pool runs dry and every
+        sample is dropped. Its slots are reclaimed and a fresh process
+        takes over with a new queue.
+        
+        An analyzer whose model failed to load, or that keeps dying, is
+        retired instead: it is taken out of the recorder's rotation and
+        not restarted. Raises RuntimeError once none are left.
+        """
+        for i, process in enumerate(self.analyzer_processes):
+            if i in self._retired_analyzers or process.is_alive():
+                continue
+            
+            now = time.monotonic()
+            deaths = self._analyzer_deaths[i]
+            deaths.append(now)
+            while now - deaths[0] > ANALYZER_RESTART_WINDOW:
+                deaths.popleft()
+            
+            if process.exitcode == EXIT_MODEL_LOAD_FAILED:
+                reason = "could not load the BirdNET model"
+            elif len(deaths) > ANALYZER_MAX_RESTARTS:
+                reason = (
+                    f"died {len(deaths)} times within "
+                    f"{ANALYZER_RESTART_WINDOW:.0f}s"
+                )
+            else:
+                reason = None
+            
+            if reason:
+                reclaimed = self.recorder.retire_queue(i)
+                self._retired_analyzers.add(i)
+                self.logger.error(
+                    f"{process.name} {reason} (exit code "
+                    f"{process.exitcode}); giving up on it, reclaimed "
+                    f"{reclaimed} sample slots"
+                )
+                continue
+            
+            samples_queue = make_queue(self.ctx)
+            reclaimed = self.recorder.replace_queue(i, samples_queue)
+            self.logger.error(
+                f"{process.name} died (exit code {process.exitcode}); "
+                f"reclaimed {reclaimed} sample slots, restarting"
+            )
+            
+            analyzer = AnalyzerWorker(
+                self.listener_config,
+                samples_queue,
+                self.detections_queue,
+                self.sample_pool
+            )
+            new_process = analyzer.start()
+            new_process.name = process.name
+            self.analyzers[i] = analyzer
+            self.analyzer_processes[i] = new_process
+        
+        if len(self._retired_analyzers) == len(self.analyzer_processes):
+            raise RuntimeError("All analyzer workers have failed")
+    
     def stop(self):
         """Stop all workers."""
         self.logger.info("Stopping all workers...")
@@ -114,21 +215,34 @@ class ListenerService:
         # Stop recorder
         self.recorder.stop()
         
-        # Stop analyzers
-        for analyzer in self.analyzers:
-            analyzer.stop()
-            # Send poison pill
-            self.samples_queue.put(None)
+        # Stop analyzers; they only listen for a poison pill
+        for samples_queue in self.samples_queues:
+            samples_queue.put(None)
         
-        # Stop database writer
-        self.db_writer.stop()
+        # Let analyzer processes drain before the writer is told to stop
+        for process in self.analyzer_processes:
+            process.join(timeout=5)
+        
+        # Stop database writer: the poison pill goes behind every queued
+        # detection, so wait for it to hand its last batch to the database
+        # before flushing. Its thread is a daemon, so the join below would
+        # skip it.
         self.detections_queue.put(None)
+        if self.db_writer_thread is not None:
+            self.db_writer_thread.join(timeout=5)
+        self.db_writer.stop()
         
         # Wait for threads to finish
         for thread in self.threads:
             if not thread.daemon and thread.is_alive():
                 thread.join(timeout=5)
         
+        # Write any buffered detections
+        self.db.flush()
+        
+        self.sample_pool.close()
+        self.sample_pool.unlink()
+        
         self.logger.info("All workers stopped")
 
 
@@ -0,0 +1,43 @@
+"""
+Queues shared between the listener's worker processes.
+"""
+from queue import Empty
+
+try:
+    import faster_fifo
+except ImportError:
+    faster_fifo = None
+
+# Capacity of each inter-process queue. faster-fifo bounds by bytes
+# rather than items; sample and detection messages are a few hundred
+# bytes each, so this holds thousands of them.
+QUEUE_SIZE_BYTES = 1024 * 1024
+
+
+def make_queue(ctx, max_size_bytes: int = QUEUE_SIZE_BYTES):
+    """
+    Create a queue that can be shared with spawned worker processes.
+    
+    Uses faster-fifo's shared-memory ring when it is installed, which
+    avoids the feeder thread and pipe of multiprocessing.Queue, and
+    falls back to ``ctx.Queue()`` otherwise. Both support
+    ``put``/``get(timeout=...)`` and raise ``queue.Empty``.
+    """
+    if faster_fifo is not None:
+        return faster_fifo.Queue(max_size_bytes=max_size_bytes)
+    return ctx.Queue()
+
+
+def get_blocking(queue):
+    """
+    Wait for the next item from a queue made by ``make_queue``.
+    
+    Consumers are woken by data or a poison pill, never by polling.
+    faster-fifo's get() cannot wait indefinitely, so it waits in long
+    stretches and simply resumes if one passes with nothing queued.
+    """
+    while True:
+        try:
+            return queue.get(timeout=3600)
+        except Empty:
+            continue
@@ -3,65 +3,191 @@ Audio recording worker for continuous audio capture using circular buffer.
 """
 import numpy as np
 import pyaudio
-from collections import deque
 from queue import Queue
+from typing import List
 import logging
 import threading
 import time
 from datetime import datetime
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+from sample_pool import SamplePool
+
 logger = logging.getLogger("magpi-listener")
 
 
+if njit is not None:
+    # nogil lets the PortAudio callback fill the ring while analyzer and
+    # API threads keep running
+    @njit(nogil=True, cache=True, boundscheck=False)
+    def _ring_write(buf, chunk, write_idx):
+        """Copy chunk into the ring at write_idx; return the new write_idx."""
+        size = buf.shape[0]
+        n = chunk.shape[0]
+        # Only the last ``size`` samples of a long chunk survive
+        skip = n - size if n > size else 0
+        pos = (write_idx + skip) % size
+        for i in range(skip, n):
+            buf[pos] = chunk[i]
+            pos += 1
+            if pos == size:
+                pos = 0
+        return write_idx + n
+    
+    @njit(nogil=True, cache=True, boundscheck=False)
+    def _ring_read_latest(buf, write_idx, n_samples, out):
+        """Copy the n_samples written before write_idx into out."""
+        size = buf.shape[0]
+        pos = (write_idx - n_samples) % size
+        for i in range(n_samples):
+            out[i] = buf[pos]
+            pos += 1
+            if pos == size:
+                pos = 0
+        return out
+else:
+    def _ring_write(buf, chunk, write_idx):
+        """Copy chunk into the ring at write_idx; return the new write_idx."""
+        size = buf.shape[0]
+        n = chunk.shape[0]
+        new_idx = write_idx + n
+        
+        if n >= size:
+            # Chunk alone fills the ring; keep only its tail, laid out
+            # so the oldest kept sample sits at the new write position
+            end = new_idx % size
+            tail = chunk[-size:]
+            buf[end:] = tail[:size - end]
+            buf[:end] = tail[size - end:]
+        else:
+            start = write_idx % size
+            first = min(n, size - start)
+            buf[start:start + first] = chunk[:first]
+            if first < n:
+                buf[:n - first] = chunk[first:]
+        return new_idx
+    
+    def _ring_read_latest(buf, write_idx, n_samples, out):
+        """Copy the n_samples written before write_idx into out."""
+        end = write_idx % buf.shape[0]
+        start = end - n_samples
+        if start >= 0:
+            np.copyto(out, buf[start:end])
+        else:
+            # Unwrap the ring
+            split = -start
+            np.copyto(out[:split], buf[start:])
+            np.copyto(out[split:], buf[:end])
+        return out
+
+
 class AudioBuffer:
-    """Circular buffer for audio data."""
+    """
+    Single-producer circular buffer for audio data.
+    
+    Lock-free: only the recorder thread calls add_chunk, which writes the
+    samples first and then publishes them with a single store to
+    write_idx (atomic under the GIL). The write itself may run without
+    the GIL, so while a reader copies, the producer can be partway
+    through a chunk of up to ``max_chunk`` samples past the published
+    index. get_sample retries unless that unpublished chunk still stayed
+    clear of the copied window.
+    """
     
     def __init__(self, sample_rate: int, duration_seconds: int, 
-                 sample_duration: int):
+                 sample_duration: int, max_chunk: int = 0):
         self.sample_rate = sample_rate
         self.duration_seconds = duration_seconds
         self.sample_duration = sample_duration
         self.buffer_size = sample_rate * duration_seconds
         self.sample_size = sample_rate * sample_duration
         
-        self.buffer = deque(maxlen=self.buffer_size)
-        self.lock = threading.RLock()
+        # How far the producer may advance during a copy without touching
+        # the copied window, allowing for one unpublished chunk
+        self.lap_margin = self.buffer_size - self.sample_size - max_chunk
+        if self.lap_margin < 0:
+            raise ValueError(
+                "Audio buffer must hold at least one sample plus one chunk"
+            )
+        
+        # Preallocated ring; write_idx counts every sample ever written, so
+        # the write position is write_idx % buffer_size
+        self.buffer = np.zeros(self.buffer_size, dtype=np.float32)
+        self.write_idx = 0
+    
+    @property
+    def filled(self) -> int:
+        """Number of valid samples currently held."""
+        return min(self.write_idx, self.buffer_size)
     
     def add_chunk(self, chunk: np.ndarray):
-        """Add audio chunk to buffer."""
-        with self.lock:
-            for sample in chunk:
-                self.buffer.append(sample)
-    
-    def get_sample(self) -> np.ndarray:
-        """Get latest sample from buffer."""
-        with self.lock:
-            if len(self.buffer) >= self.sample_size:
-                # Get the last N samples
-                sample = list(self.buffer)[-self.sample_size:]
-                return np.array(sample, dtype=np.float32)
-            return None
+        """Add audio chunk to buffer (producer thread only)."""
+        new_idx = _ring_write(self.buffer, chunk, self.write_idx)
+        # Publish only after the data is in place
+        self.write_idx = new_idx
+    
+    def get_sample(self, out: np.ndarray = None) -> np.ndarray:
+        """
+        Get latest sample from buffer.
+        
+        Args:
+            out: Optional array of ``sample_size`` samples to copy into
+                instead of allocating a new one
+        """
+        if out is None:
+            out = np.empty(self.sample_size, dtype=np.float32)
+        
+        while True:
+            write_idx = self.write_idx
+            if min(write_idx, self.buffer_size) < self.sample_size:
+                return None
+            
+            _ring_read_latest(self.buffer, write_idx, self.sample_size, out)
+            
+            # Slots ahead of the window are free for the producer; only
+            # retry if it (or the chunk it may still be writing) got far
+            # enough to reach the copied samples
+            if self.write_idx - write_idx <= self.lap_margin:
+                return out
     
     def is_ready(self) -> bool:
         """Check if buffer has enough data."""
-        with self.lock:
-            return len(self.buffer) >= self.sample_size
+        return self.filled >= self.sample_size
 
 
 class RecorderWorker:
     """Worker for recording audio from microphone."""
     
-    def __init__(self, config, samples_queue: Queue):
+    def __init__(self, config, samples_queues: List[Queue],
+                 sample_pool: SamplePool):
         self.config = config
-        self.samples_queue = samples_queue
+        self.samples_queues = samples_queues
+        self.sample_pool = sample_pool
+        # Indices of the analyzer queues still in rotation
+        self._routes = list(range(len(samples_queues)))
+        self._next_route = 0
+        # Held while dealing a slot, so replace_queue never misses one
+        self._route_lock = threading.Lock()
         self.running = False
         self.audio_buffer = AudioBuffer(
             config.sample_rate,
             config.buffer_duration,
-            config.sample_duration
+            config.sample_duration,
+            max_chunk=config.chunk_size
         )
         self.p = None
         self.stream = None
+        # Mock mode fills one reusable buffer in place; _queue_sample
+        # copies it into a pool slot, so it is never shared
+        self._rng = np.random.default_rng()
+        self._mock_buf = np.empty(
+            config.sample_rate * config.sample_duration,
+            dtype=np.float32
+        )
     
     def setup_audio(self):
         """Setup PyAudio stream."""
@@ -84,7 +210,8 @@ class RecorderWorker:
                 input=True,
                 input_device_index=device_index,
                 frames_per_buffer=self.config.chunk_size,
-                start=False
+                start=False,
+                stream_callback=self._on_audio
             )
             
             logger.info("Audio stream created successfully")
@@ -96,6 +223,19 @@ class RecorderWorker:
             # Return False to indicate mock mode
             return False
     
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        """
+        PortAudio stream callback.
+        
+        Runs on PortAudio's own thread, so no Python thread sits in a
+        blocking read; PortAudio captures into its native buffers and only
+        takes the GIL to hand over a finished chunk. This is the ring
+        buffer's only producer. Overflow status is ignored, as the
+        blocking read did.
+        """
+        self.audio_buffer.add_chunk(np.frombuffer(in_data, dtype=np.float32))
+        return (None, pyaudio.paContinue)
+    
     def run(self):
         """Main recording loop."""
         try:
@@ -117,46 +257,37 @@ class RecorderWorker:
             self.stop()
     
     def _run_real_audio(self):
-        """Recording loop with real audio."""
+        """Sample scheduling loop with real audio."""
         logger.info("Starting real audio recording loop")
         sample_interval = self.config.sample_duration
-        last_sample_time = datetime.utcnow()
+        # Scheduling uses the monotonic clock; wall-clock time is only read
+        # for the timestamp of a sample actually queued
+        last_sample_ts = time.monotonic()
+        
+        # Audio arrives via _on_audio; this loop only cuts samples, checking
+        # once per chunk period
+        sample_rate = self.config.sample_rate
+        poll_interval = self.config.chunk_size / sample_rate
+        
+        # Bound once; the loop body runs every chunk period
+        sleep = time.sleep
+        monotonic = time.monotonic
+        buffer_ready = self.audio_buffer.is_ready
+        queue_latest_sample = self._queue_latest_sample
         
         while self.running:
             try:
-                # Check if there's data available
-                if self.stream.get_read_available() < self.config.chunk_size:
-                    time.sleep(0.01)  # Wait a bit if no data available
-                    continue
-                
-                # Read chunk from stream
-                data = self.stream.read(self.config.chunk_size, 
-                                    exception_on_overflow=False)
-                chunk = np.frombuffer(data, dtype=np.float32)
-                
-                # Add to buffer
-                self.audio_buffer.add_chunk(chunk)
+                sleep(poll_interval)
                 
                 # Check if we should send a sample
-                now = datetime.utcnow()
-                elapsed = (now - last_sample_time).total_seconds()
-                
-                buffer_ready = self.audio_buffer.is_ready()
-                logger.debug(
-                    f"Buffer status: elapsed={elapsed:.2f}s, ready={buffer_ready}, "
-                    f"buffer_len={len(self.audio_buffer.buffer)}, needed={self.audio_buffer.sample_size}"
-                )
+                now_ts = monotonic()
                 
-                if elapsed >= sample_interval and buffer_ready:
-                    sample = self.audio_buffer.get_sample()
-                    if sample is not None:
-                        logger.debug(f"Queuing sample for analysis (size: {len(sample)} samples)")
-                        self.samples_queue.put({
-                            'audio': sample,
-                            'timestamp': now,
-                            'sample_rate': self.config.sample_rate
-                        })
-                        last_sample_time = now
+                if now_ts - last_sample_ts >= sample_interval and buffer_ready():
+                    queue_latest_sample({
+                        'timestamp': datetime.utcnow(),
+                        'sample_rate': sample_rate
+                    })
+                    last_sample_ts = now_ts
             
             except Exception as e:
                 logger.error(f"Error in recording loop: {e}", exc_info=True)
@@ -166,7 +297,7 @@ class RecorderWorker:
     def _run_mock_audio(self):
         """Recording loop in mock mode (generates random audio)."""
         sample_interval = self.config.sample_duration
-        last_sample_time = datetime.utcnow()
+        last_sample_ts = time.monotonic()
         
         while self.running:
             try:
@@ -174,25 +305,114 @@ class RecorderWorker:
                 time.sleep(0.1)
                 
                 # Check if we should send a sample
-                now = datetime.utcnow()
-                elapsed = (now - last_sample_time).total_seconds()
+                now_ts = time.monotonic()
                 
-                if elapsed >= sample_interval:
+                if now_ts - last_sample_ts >= sample_interval:
                     # Generate mock audio (silent audio with some noise)
-                    mock_sample = np.random.normal(0, 0.01, 
-                                                  self.config.sample_rate * sample_interval).astype(np.float32)
-                    self.samples_queue.put({
-                        'audio': mock_sample,
-                        'timestamp': now,
+                    self._rng.standard_normal(
+                        dtype=np.float32,
+                        out=self._mock_buf
+                    )
+                    self._mock_buf *= 0.01
+                    self._queue_sample({
+                        'audio': self._mock_buf,
+                        'timestamp': datetime.utcnow(),
                         'sample_rate': self.config.sample_rate,
                         'is_mock': True
                     })
-                    last_sample_time = now
+                    last_sample_ts = now_ts
             
             except Exception as e:
                 logger.error(f"Error in mock recording loop: {e}")
                 continue
     
+    def _acquire_slot(self):
+        """
+        Take a free shared pool slot, or None if every slot is still in
+        use. Samples are dropped in that case rather than stalling the
+        recorder.
+        """
+        slot = self.sample_pool.acquire(timeout=0.5)
+        if slot is None:
+            logger.warning("No free sample slots, analyzers are behind; "
+                           "dropping sample")
+        return slot
+    
+    def _send_slot(self, slot: int, length: int, sample_data: dict):
+        """Hand a filled slot to the next analyzer queue, round-robin."""
+        sample_data['slot'] = slot
+        sample_data['length'] = length
+        
+        with self._route_lock:
+            if not self._routes:
+                logger.warning("No analyzers left; dropping sample")
+                self.sample_pool.release(slot)
+                return
+            index = self._routes[self._next_route]
+            self._next_route = (self._next_route + 1) % len(self._routes)
+            # Owner ids are 1-based; 0 marks an unassigned slot
+            self.sample_pool.assign(slot, index + 1)
+            self.samples_queues[index].put(sample_data)
+    
+    def replace_queue(self, index: int, queue: Queue) -> int:
+        """
+        Route analyzer ``index``'s samples to a new queue.
+        
+        Used when that analyzer's process has died: every slot dealt to
+        it, whether still queued or held by the dead process, is returned
+        to the pool, and the old queue is abandoned.
+        
+        Returns:
+            Number of slots reclaimed
+        """
+        with self._route_lock:
+            self.samples_queues[index] = queue
+            return self.sample_pool.reclaim(index + 1)
+    
+    def retire_queue(self, index: int) -> int:
+        """
+        Stop dealing samples to analyzer ``index`` and reclaim its slots.
+        
+        Used when that analyzer has been given up on.
+        
+        Returns:
+            Number of slots reclaimed
+        """
+        with self._route_lock:
+            self._routes.remove(index)
+            self._next_route = 0
+            return self.sample_pool.reclaim(index + 1)
+    
+    def _queue_latest_sample(self, sample_data: dict):
+        """Copy the newest window from the ring straight into a pool slot."""
+        slot = self._acquire_slot()
+        if slot is None:
+            return
+        
+        sample_size = self.audio_buffer.sample_size
+        sample = self.audio_buffer.get_sample(
+            out=self.sample_pool.slot(slot, sample_size)
+        )
+        if sample is None:
+            self.sample_pool.release(slot)
+            return
+        
+        # Lazy formatting: this runs on the sampling path
+        logger.debug(
+            "Queuing sample for analysis (size: %d samples)", sample_size
+        )
+        self._send_slot(slot, sample_size, sample_data)
+    
+    def _queue_sample(self, sample_data: dict):
+        """Copy a sample into a shared pool slot and queue it."""
+        audio = sample_data.pop('audio')
+        slot = self._acquire_slot()
+        if slot is None:
+            return
+        
+        np.copyto(self.sample_pool.slot(slot, len(audio)), audio)
+        self._send_slot(slot, len(audio), sample_data)
+    
     def stop(self):
         """Stop recording."""
         self.running = False
@@ -0,0 +1,146 @@
+"""
+Shared-memory pool of audio sample slots.
+
+Lets the recorder hand samples to analyzer processes without pickling
+the audio: only a slot index travels through the queue.
+"""
+from multiprocessing import shared_memory
+from queue import Empty
+from typing import Optional
+import logging
+import weakref
+
+import numpy as np
+
+from queues import make_queue
+
+logger = logging.getLogger("magpi-listener")
+
+
+class SamplePool:
+    """
+    Fixed set of float32 sample slots backed by one shared memory block.
+    
+    The block also records which consumer each slot was handed to, so
+    the slots held by a consumer that died can be reclaimed.
+    """
+    
+    def __init__(self, ctx, num_slots: int, slot_size: int):
+        """
+        Args:
+            ctx: multiprocessing context used for the free-slot queue fallback
+            num_slots: Number of samples that can be in flight at once
+            slot_size: Capacity of each slot in samples
+        """
+        self.num_slots = num_slots
+        self.slot_size = slot_size
+        self._data_bytes = (
+            num_slots * slot_size * np.dtype(np.float32).itemsize
+        )
+        # Sample data followed by one int32 owner id per slot
+        self.shm = shared_memory.SharedMemory(
+            create=True,
+            size=self._data_bytes + num_slots * np.dtype(np.int32).itemsize
+        )
+        self.free_slots = make_queue(ctx)
+        for i in range(num_slots):
+            self.free_slots.put(i)
+        self._array = None
+        self._owners = None
+        self._leases = {}
+        self.owners[:] = 0
+    
+    def __getstate__(self):
+        # The numpy views and leases are process-local; rebuild after
+        # unpickling
+        state = self.__dict__.copy()
+        state['_array'] = None
+        state['_owners'] = None
+        state['_leases'] = {}
+        return state
+    
+    @property
+    def array(self) -> np.ndarray:
+        """All slots as a (num_slots, slot_size) float32 view."""
+        if self._array is None:
+            self._array = np.ndarray(
+                (self.num_slots, self.slot_size),
+                dtype=np.float32,
+                buffer=self.shm.buf
+            )
+        return self._array
+    
+    @property
+    def owners(self) -> np.ndarray:
+        """Owner id of each slot; 0 while free or not yet handed out."""
+        if self._owners is None:
+            self._owners = np.ndarray(
+                (self.num_slots,),
+                dtype=np.int32,
+                buffer=self.shm.buf,
+                offset=self._data_bytes
+            )
+        return self._owners
+    
+    def acquire(self, timeout: float = 1.0) -> Optional[int]:
+        """Take a free slot index, or None if none frees up in time."""
+        try:
+            return self.free_slots.get(timeout=timeout)
+        except Empty:
+            return None
+    
+    def assign(self, slot: int, owner: int):
+        """Record that ``slot`` was handed to consumer ``owner`` (> 0)."""
+        self.owners[slot] = owner
+    
+    def release(self, slot: int):
+        """Return a slot to the pool."""
+        lease = self._leases.pop(slot, None)
+        if lease is not None:
+            # Runs at most once, so a slot already returned by the
+            # garbage collector is not queued twice
+            lease()
+        else:
+            self._free(slot)
+    
+    def reclaim(self, owner: int) -> int:
+        """
+        Return every slot assigned to ``owner`` to the pool.
+        
+        Only safe once that consumer can no longer release them itself,
+        e.g. after its process has died. Returns the number reclaimed.
+        """
+        slots = np.flatnonzero(self.owners == owner)
+        for slot in slots:
+            self._free(int(slot))
+        return len(slots)
+    
+    def _free(self, slot: int):
+        self.owners[slot] = 0
+        self.free_slots.put(slot)
+    
+    def lease(self, slot: int, length: Optional[int] = None) -> np.ndarray:
+        """
+        View of a slot handed to a consumer.
+        
+        The slot should be given back with ``release``; as a safety net it
+        also returns to the pool if the view is garbage collected first.
+        """
+        view = self.slot(slot, length)
+        self._leases[slot] = weakref.finalize(view, self._free, slot)
+        return view
+    
+    def slot(self, slot: int, length: Optional[int] = None) -> np.ndarray:
+        """View of one slot, optionally truncated to ``length`` samples."""
+        view = self.array[slot]
+        return view if length is None else view[:length]
+    
+    def close(self):
+        """Detach this process from the shared memory block."""
+        self._array = None
+        self._owners = None
+        self.shm.close()
+    
+    def unlink(self):
+        """Free the shared memory block (owning process only)."""
+        self.shm.unlink()